@@ -20,6 +20,9 @@ TOPICS = [
     "Neural_network"
 ]
 
+# Days of history re-requested on every run
+HISTORY_DAYS = 365
+
 def ingest_data_for_topic(session: Session, topic: str, start_date: str, end_date: str):
     """
     Fetch and store data for a single topic.
@@ -40,6 +43,9 @@ def ingest_data_for_topic(session: Session, topic: str, start_date: str, end_dat
         session.commit()
         session.refresh(page)
     
+    # Load existing dates once instead of querying per row
+    existing_dates = {d for (d,) in session.query(PageView.date).filter_by(page_id=page.page_id).all()}
+    
     # Process items
     new_records = 0
     for item in data['items']:
@@ -47,11 +53,11 @@ def ingest_data_for_topic(session: Session, topic: str, start_date: str, end_dat
         views = item['views']
         date_obj = datetime.datetime.strptime(date_str, "%Y%m%d").date()
         
-        # Check if record exists
-        exists = session.query(PageView).filter_by(page_id=page.page_id, date=date_obj).first()
-        if not exists:
+        # Check if record exists (also guards against repeated items in one response)
+        if date_obj not in existing_dates:
             record = PageView(date=date_obj, page_id=page.page_id, views=views)
             session.add(record)
+            existing_dates.add(date_obj)
             new_records += 1
             
     session.commit()
@@ -79,7 +85,7 @@ def run_daily_etl():
     
     today = datetime.date.today()
     end_date = today.strftime("%Y%m%d")
-    start_date = (today - datetime.timedelta(days=365)).strftime("%Y%m%d")
+    start_date = (today - datetime.timedelta(days=HISTORY_DAYS)).strftime("%Y%m%d")
     
     try:
         for topic in TOPICS:
@@ -0,0 +1,202 @@
+import datetime
+import numpy as np
+import pandas as pd
+from typing import Optional
+from sqlalchemy.orm import Session
+from src.warehouse.db import get_db
+from src.warehouse.models import Page, PageView, DataQualityReport
+from src.pipelines.daily_etl import HISTORY_DAYS, ingest_data_for_topic
+from src.pipelines.gap_filling import DEFAULT_FILL_METHOD, fill_gaps, reindex_to_calendar
+
+# Robust z-score (median/MAD) above which a day's views are flagged as an outlier
+OUTLIER_THRESHOLD = 5.0
+
+
+def run_quality_checks(df: pd.DataFrame, start_date: Optional[datetime.date] = None,
+                       end_date: Optional[datetime.date] = None):
+    """
+    Vectorized data-quality checks across all pages.
+    Same as `reindex_to_calendar`, plus an 'is_outlier' flag on the calendar.
+    """
+    calendar, duplicates = reindex_to_calendar(df, start_date, end_date)
+
+    # Outliers: robust z-score against each page's median/MAD
+    valid = calendar['views'].where(~calendar['is_non_positive'])
+    median = valid.groupby(calendar['page_id']).transform('median')
+    mad = (valid - median).abs().groupby(calendar['page_id']).transform('median')
+    robust_z = (valid - median) / (1.4826 * mad.replace(0, np.nan))
+    calendar['is_outlier'] = robust_z.abs() > OUTLIER_THRESHOLD
+
+    return calendar, duplicates
+
+
+def find_missing_ranges(calendar: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapse missing days into contiguous (page_id, start_date, end_date) ranges.
+    """
+    missing = calendar.loc[calendar['is_missing'], ['page_id', 'date']]
+    if missing.empty:
+        return pd.DataFrame({
+            'page_id': pd.Series(dtype='int64'),
+            'start_date': pd.Series(dtype='datetime64[ns]'),
+            'end_date': pd.Series(dtype='datetime64[ns]'),
+            'days': pd.Series(dtype='int64'),
+        })
+
+    # A new range starts when the page changes or the previous missing day isn't yesterday
+    new_range = (missing['page_id'].diff() != 0) | (missing['date'].diff() != pd.Timedelta(days=1))
+    ranges = missing.groupby(new_range.cumsum()).agg(
+        page_id=('page_id', 'first'),
+        start_date=('date', 'min'),
+        end_date=('date', 'max'),
+        days=('date', 'size'),
+    )
+    return ranges.reset_index(drop=True)
+
+
+def build_quality_report(calendar: pd.DataFrame, duplicates: pd.DataFrame,
+                         fill_method: Optional[str] = DEFAULT_FILL_METHOD) -> pd.DataFrame:
+    """
+    Aggregate per-row flags into one report row per page.
+    """
+    calendar = calendar.copy()
+    calendar['is_filled'] = fill_gaps(calendar, fill_method).notna() & (calendar['is_missing'] | calendar['is_non_positive'])
+
+    report = calendar.groupby('page_id').agg(
+        start_date=('date', 'min'),
+        end_date=('date', 'max'),
+        expected_days=('date', 'size'),
+        missing_days=('is_missing', 'sum'),
+        non_positive_days=('is_non_positive', 'sum'),
+        outlier_days=('is_outlier', 'sum'),
+        filled_days=('is_filled', 'sum'),
+    )
+    report['observed_days'] = report['expected_days'] - report['missing_days']
+    report['duplicate_rows'] = duplicates.groupby('page_id').size().reindex(report.index, fill_value=0)
+
+    report['missing_ranges'] = summarize_ranges(find_missing_ranges(calendar), report.index)
+
+    return report.reset_index()
+
+
+def summarize_ranges(ranges: pd.DataFrame, page_ids: pd.Index) -> pd.Series:
+    """
+    Join each page's ranges into a "start..end;start..end" label (None when a page has none).
+    """
+    if ranges.empty:
+        return pd.Series([None] * len(page_ids), index=page_ids, dtype=object)
+    labels = ranges['start_date'].dt.strftime('%Y-%m-%d') + '..' + ranges['end_date'].dt.strftime('%Y-%m-%d')
+    return labels.groupby(ranges['page_id']).agg(';'.join).reindex(page_ids)
+
+
+def load_refetch_attempts(session: Session) -> set:
+    """
+    (page_id, "start..end") ranges already re-requested by earlier runs.
+    """
+    rows = session.query(DataQualityReport.page_id, DataQualityReport.refetched_ranges).filter(
+        DataQualityReport.refetched_ranges.isnot(None)
+    ).all()
+    return {(page_id, label) for page_id, labels in rows for label in labels.split(';')}
+
+
+def select_refetch_ranges(ranges: pd.DataFrame, window_start: datetime.date, attempted: set) -> pd.DataFrame:
+    """
+    Keep the parts of missing ranges the daily ETL window doesn't already re-request,
+    skipping ranges an earlier run already tried to re-fetch.
+    """
+    window_start = pd.Timestamp(window_start)
+    ranges = ranges[ranges['start_date'] < window_start].copy()
+    ranges['end_date'] = ranges['end_date'].clip(upper=window_start - pd.Timedelta(days=1))
+    ranges['days'] = (ranges['end_date'] - ranges['start_date']).dt.days + 1
+
+    labels = ranges['start_date'].dt.strftime('%Y-%m-%d') + '..' + ranges['end_date'].dt.strftime('%Y-%m-%d')
+    seen = [(page_id, label) in attempted for page_id, label in zip(ranges['page_id'], labels)]
+    return ranges[~np.array(seen, dtype=bool)].reset_index(drop=True)
+
+
+def refetch_missing_ranges(session: Session, ranges: pd.DataFrame):
+    """
+    Re-ingest only the missing date ranges for each page.
+    """
+    titles = dict(session.query(Page.page_id, Page.page_title).all())
+    for r in ranges.itertuples():
+        start = r.start_date.strftime("%Y%m%d")
+        end = r.end_date.strftime("%Y%m%d")
+        print(f"Re-fetching {titles[r.page_id]} for {start}-{end}...")
+        ingest_data_for_topic(session, titles[r.page_id], start, end)
+
+
+def save_quality_report(session: Session, report: pd.DataFrame):
+    """
+    Write the per-page quality report to fact_data_quality.
+    """
+    for row in report.itertuples():
+        session.add(DataQualityReport(
+            page_id=int(row.page_id),
+            start_date=row.start_date.date(),
+            end_date=row.end_date.date(),
+            expected_days=int(row.expected_days),
+            observed_days=int(row.observed_days),
+            missing_days=int(row.missing_days),
+            duplicate_rows=int(row.duplicate_rows),
+            non_positive_days=int(row.non_positive_days),
+            outlier_days=int(row.outlier_days),
+            filled_days=int(row.filled_days),
+            missing_ranges=row.missing_ranges if isinstance(row.missing_ranges, str) else None,
+            refetched_ranges=row.refetched_ranges if isinstance(row.refetched_ranges, str) else None,
+        ))
+    session.commit()
+
+
+def load_pageviews(session: Session) -> pd.DataFrame:
+    query = session.query(PageView.id, PageView.page_id, PageView.date, PageView.views)
+    return pd.read_sql(query.statement, session.bind)
+
+
+def run_data_quality(refetch: bool = True, remove_duplicates: bool = True):
+    print("Starting Data Quality Checks...")
+    session = next(get_db())
+    # Check through yesterday so trailing gaps (e.g. a missed daily run) are caught
+    end_date = datetime.date.today() - datetime.timedelta(days=1)
+    try:
+        df = load_pageviews(session)
+        if df.empty:
+            print("No pageviews to check.")
+            return
+
+        calendar, duplicates = run_quality_checks(df, end_date=end_date)
+
+        # The daily ETL already re-requests its whole window, so only older
+        # gaps are re-fetched, and each range is only tried once
+        ranges = find_missing_ranges(calendar)
+        refetched = ranges.iloc[0:0]
+        if refetch:
+            window_start = datetime.date.today() - datetime.timedelta(days=HISTORY_DAYS)
+            refetched = select_refetch_ranges(ranges, window_start, load_refetch_attempts(session))
+            if not refetched.empty:
+                refetch_missing_ranges(session, refetched)
+                # Re-check with the re-fetched rows included
+                df = load_pageviews(session)
+                calendar, duplicates = run_quality_checks(df, end_date=end_date)
+
+        if remove_duplicates and not duplicates.empty:
+            print(f"Removing {len(duplicates)} duplicate pageview rows...")
+            session.query(PageView).filter(PageView.id.in_(duplicates['id'].tolist())).delete(synchronize_session=False)
+            session.commit()
+
+        report = build_quality_report(calendar, duplicates)
+        report['refetched_ranges'] = summarize_ranges(refetched, pd.Index(report['page_id'])).to_numpy()
+        save_quality_report(session, report)
+        print(f"  Missing days: {int(report['missing_days'].sum())}, "
+              f"duplicates: {int(report['duplicate_rows'].sum())}, "
+              f"non-positive: {int(report['non_positive_days'].sum())}, "
+              f"outliers: {int(report['outlier_days'].sum())}")
+    except Exception as e:
+        print(f"Data Quality Checks failed: {e}")
+        session.rollback()
+    finally:
+        session.close()
+    print("Data Quality Checks Completed.")
+
+if __name__ == "__main__":
+    run_data_quality()
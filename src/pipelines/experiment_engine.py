@@ -1,56 +1,242 @@
+import os
 import numpy as np
+import pandas as pd
 import scipy.stats as stats
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
 from sqlalchemy.orm import Session
+from statsmodels.stats.multitest import multipletests
 from src.warehouse.db import get_db
 from src.warehouse.models import Page, PageMetric, ExperimentResult
 import uuid
 
+# Metric columns loaded (once per page) for experiment analysis
+METRIC_COLUMNS = [
+    'rolling_7d_avg',
+    'rolling_30d_avg',
+    'growth_rate_daily',
+    'growth_rate_weekly',
+    'stl_residual',
+]
+
+# CUPED covariate. Lagged by one day so it only uses pre-exposure information.
+COVARIATE_COLUMN = 'rolling_30d_avg'
+
+METHODS = ('t_test', 'bootstrap', 'permutation')
+MIN_SAMPLES = 10
+
+
+def cuped_adjust(values: np.ndarray, covariate: np.ndarray) -> np.ndarray:
+    """
+    Apply CUPED variance reduction: y_adj = y - theta * (x - mean(x)).
+    theta is estimated on the pooled sample so both groups share the same adjustment.
+    """
+    cov_var = np.var(covariate, ddof=1)
+    if cov_var == 0 or not np.isfinite(cov_var):
+        return values
+    theta = np.cov(values, covariate, ddof=1)[0, 1] / cov_var
+    return values - theta * (covariate - covariate.mean())
+
+
+def welch_interval(treatment: np.ndarray, control: np.ndarray, confidence: float = 0.95):
+    """
+    Confidence interval for the difference in means of two independent samples.
+    """
+    var_t = np.var(treatment, ddof=1) / len(treatment)
+    var_c = np.var(control, ddof=1) / len(control)
+    se = np.sqrt(var_t + var_c)
+    diff = np.mean(treatment) - np.mean(control)
+    if se == 0:
+        # Both groups are constant: the difference is known exactly
+        return diff, diff
+    # Welch-Satterthwaite degrees of freedom
+    dof = (var_t + var_c) ** 2 / (var_t ** 2 / (len(treatment) - 1) + var_c ** 2 / (len(control) - 1))
+    return stats.t.interval(confidence, df=dof, loc=diff, scale=se)
+
+
+def bootstrap_test(treatment: np.ndarray, control: np.ndarray, rng: np.random.Generator,
+                   n_resamples: int = 2000, confidence: float = 0.95):
+    """
+    Vectorized percentile bootstrap of the difference in means.
+    Returns (p_value, ci_low, ci_high). The p-value is the two-sided
+    proportion of bootstrap differences on the other side of zero.
+    """
+    idx_t = rng.integers(0, len(treatment), size=(n_resamples, len(treatment)))
+    idx_c = rng.integers(0, len(control), size=(n_resamples, len(control)))
+    diffs = treatment[idx_t].mean(axis=1) - control[idx_c].mean(axis=1)
+
+    alpha = 1 - confidence
+    ci_low, ci_high = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    p_value = min(1.0, 2 * min(np.mean(diffs <= 0), np.mean(diffs >= 0)))
+    return p_value, ci_low, ci_high
+
+
+def permutation_test(treatment: np.ndarray, control: np.ndarray, rng: np.random.Generator,
+                     n_resamples: int = 2000) -> float:
+    """
+    Vectorized two-sided permutation test on the difference in means.
+    """
+    pooled = np.concatenate([treatment, control])
+    n_t = len(treatment)
+    observed = treatment.mean() - control.mean()
+
+    shuffled = rng.permuted(np.broadcast_to(pooled, (n_resamples, len(pooled))), axis=1)
+    diffs = shuffled[:, :n_t].mean(axis=1) - shuffled[:, n_t:].mean(axis=1)
+
+    # Add-one correction keeps the p-value strictly positive
+    return (np.sum(np.abs(diffs) >= abs(observed)) + 1) / (n_resamples + 1)
+
+
+def analyze_experiment(values: np.ndarray, covariate: Optional[np.ndarray], lift: float, method: str,
+                       use_cuped: bool, n_resamples: int, rng: np.random.Generator) -> dict:
+    """
+    Run a single experiment on historical data for one page.
+
+    Days are randomly assigned to control/treatment and the treatment days
+    receive the simulated lift.
+    """
+    # 1. Random assignment of historical days
+    is_treatment = rng.random(len(values)) < 0.5
+    outcome = values.copy()
+    # Same lift definition as the synthetic simulation: shift by baseline_mean * lift
+    outcome[is_treatment] += np.mean(values) * lift
+
+    # 2. Optional CUPED adjustment
+    if use_cuped and covariate is not None:
+        outcome = cuped_adjust(outcome, covariate)
+
+    treatment_group = outcome[is_treatment]
+    control_group = outcome[~is_treatment]
+
+    # 3. Effect Size (Cohen's d)
+    pooled_std = np.sqrt((np.var(control_group) + np.var(treatment_group)) / 2)
+    diff = np.mean(treatment_group) - np.mean(control_group)
+    cohens_d = diff / pooled_std if pooled_std > 0 else 0.0
+
+    # 4. Significance test + 95% CI
+    if method == 'bootstrap':
+        p_value, ci_low, ci_high = bootstrap_test(treatment_group, control_group, rng, n_resamples)
+    elif method == 'permutation':
+        p_value = permutation_test(treatment_group, control_group, rng, n_resamples)
+        ci_low, ci_high = welch_interval(treatment_group, control_group)
+    else:
+        _, p_value = stats.ttest_ind(treatment_group, control_group, equal_var=False)
+        ci_low, ci_high = welch_interval(treatment_group, control_group)
+
+    return {
+        'lift': lift,
+        'method': method,
+        'use_cuped': use_cuped,
+        'effect_size': float(cohens_d),
+        'p_value': float(p_value),
+        'ci_low': float(ci_low),
+        'ci_high': float(ci_high),
+    }
+
+
+def analyze_page_experiments(task: dict) -> List[dict]:
+    """
+    Run every (lift, method) experiment for one page/metric.
+
+    Runs in a worker process, so it only takes plain arrays and parameters
+    (no DB session). The arrays are sent to the worker once per page/metric.
+    """
+    seeds = task['seed'].spawn(len(task['lifts']) * len(task['methods']))
+    results = []
+    for lift in task['lifts']:
+        for method in task['methods']:
+            rng = np.random.default_rng(seeds[len(results)])
+            result = analyze_experiment(task['values'], task['covariate'], lift, method,
+                                        task['use_cuped'], task['n_resamples'], rng)
+            result['page_id'] = task['page_id']
+            result['metric_name'] = task['metric_name']
+            results.append(result)
+    return results
+
+
 class ExperimentEngine:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, max_workers: Optional[int] = None):
         self.session = session
+        self.max_workers = max_workers
+        # page_id -> metrics DataFrame, loaded once and reused across experiments
+        self._metrics_cache: Dict[int, pd.DataFrame] = {}
+
+    def load_metrics(self, page_ids: Sequence[int]):
+        """
+        Load metric arrays for all uncached pages in a single query.
+        """
+        missing = [pid for pid in page_ids if pid not in self._metrics_cache]
+        if not missing:
+            return
+
+        columns = [PageMetric.page_id, PageMetric.date] + [getattr(PageMetric, c) for c in METRIC_COLUMNS]
+        query = self.session.query(*columns).filter(PageMetric.page_id.in_(missing)).order_by(PageMetric.page_id, PageMetric.date)
+        df = pd.read_sql(query.statement, self.session.bind)
+
+        for pid in missing:
+            self._metrics_cache[pid] = df[df['page_id'] == pid].reset_index(drop=True)
+
+    def get_metric_arrays(self, page_id: int, metric_name: str, use_cuped: bool = True):
+        """
+        Return (values, covariate) for a page, dropping days where the metric is missing.
+        The covariate is the previous day's rolling_30d_avg; with CUPED on, days missing
+        the covariate are dropped too. Without CUPED the covariate is None.
+        """
+        self.load_metrics([page_id])
+        df = self._metrics_cache[page_id]
+        if not use_cuped:
+            return df[metric_name].dropna().to_numpy(dtype=float), None
+
+        # Lag by calendar day, not by row, so skipped dates don't leak an older value in
+        metrics = df.set_index(pd.to_datetime(df['date']))
+        frame = pd.DataFrame({
+            'value': metrics[metric_name],
+            'covariate': metrics[COVARIATE_COLUMN].shift(1, freq='D'),
+        }).reindex(metrics.index).dropna()
+        return frame['value'].to_numpy(dtype=float), frame['covariate'].to_numpy(dtype=float)
 
     def simulate_experiment(self, page_id: int, metric_name: str = 'growth_rate_daily', lift: float = 0.05, n_samples: int = 1000):
         """
         Simulate an A/B test based on the historical stats of a page.
-        
+
         Args:
             metric_name: The metric to test (e.g., 'growth_rate_daily')
             lift: The simulated relative effect size (e.g., 0.05 for 5% lift)
             n_samples: Sample size for simulation
         """
-        # 1. Get baseline stats from DB
-        metrics = self.session.query(getattr(PageMetric, metric_name)).filter_by(page_id=page_id).all()
-        values = [m[0] for m in metrics if m[0] is not None]
-        
-        if len(values) < 10:
+        # 1. Get baseline stats (cached per page)
+        self.load_metrics([page_id])
+        values = self._metrics_cache[page_id][metric_name].dropna().to_numpy(dtype=float)
+
+        if len(values) < MIN_SAMPLES:
             print(f"Not enough data to simulate experiment for page {page_id}")
             return
 
         baseline_mean = np.mean(values)
         baseline_std = np.std(values)
-        
+
         # 2. Generate Synthetic Control Group
         # Sample directly from historical distribution or normal approx
         control_group = np.random.normal(baseline_mean, baseline_std, n_samples)
-        
+
         # 3. Generate Synthetic Treatment Group (with lift)
         # Treatment mean = baseline * (1 + lift) if positive, else just shift
         treatment_mean = baseline_mean * (1 + lift)
         treatment_group = np.random.normal(treatment_mean, baseline_std, n_samples)
-        
-        # 4. Perform T-Test
-        t_stat, p_value = stats.ttest_ind(treatment_group, control_group)
-        
+
+        # 4. Perform Welch's T-Test (matches the Welch CI below)
+        t_stat, p_value = stats.ttest_ind(treatment_group, control_group, equal_var=False)
+
         # 5. Calculate Effect Size (Cohen's d)
         pooled_std = np.sqrt((np.var(control_group) + np.var(treatment_group)) / 2)
         cohens_d = (np.mean(treatment_group) - np.mean(control_group)) / pooled_std
-        
-        # 6. Confidence Interval (95%)
-        ci_low, ci_high = stats.t.interval(0.95, df=len(control_group)+len(treatment_group)-2, loc=(np.mean(treatment_group) - np.mean(control_group)), scale=stats.sem(treatment_group - control_group))
-        
+
+        # 6. Confidence Interval (95%) - groups are independent, not paired
+        ci_low, ci_high = welch_interval(treatment_group, control_group)
+
         # 7. Record Result
         conclusion = "Significant" if p_value < 0.05 else "Not Significant"
-        
+
         result = ExperimentResult(
             run_id=str(uuid.uuid4()),
             metric_name=f"{metric_name}_simulated_lift_{lift}",
@@ -63,20 +249,130 @@ class ExperimentEngine:
         )
         self.session.add(result)
         self.session.commit()
-        
+
         print(f"Experiment Run: {conclusion} (p={p_value:.4f}, effect={cohens_d:.4f})")
 
+    def run_experiments_batch(
+        self,
+        page_ids: Sequence[int],
+        metric_names: Sequence[str] = ('growth_rate_daily',),
+        lifts: Sequence[float] = (0.10,),
+        methods: Sequence[str] = ('bootstrap', 'permutation'),
+        use_cuped: bool = True,
+        n_resamples: int = 2000,
+        alpha: float = 0.05,
+        correction: str = 'fdr_bh',
+        seed: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Run experiments on historical data for many pages in parallel.
+
+        Every (page, metric, lift, method) combination is one experiment. Metric
+        arrays are loaded once per page, the resampling runs in a process pool, and
+        p-values are corrected for multiple testing across pages within each
+        (metric, lift, method) family.
+
+        Args:
+            methods: Any of 't_test', 'bootstrap', 'permutation'
+            use_cuped: Reduce variance using the lagged rolling_30d_avg as covariate
+            correction: Any statsmodels `multipletests` method (e.g., 'fdr_bh', 'holm')
+        """
+        for method in methods:
+            if method not in METHODS:
+                raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+        # 1. Load every page's metrics in one query, then build one task per page/metric
+        self.load_metrics(page_ids)
+        seeds = np.random.SeedSequence(seed).spawn(len(page_ids) * len(metric_names))
+
+        tasks = []
+        for i, page_id in enumerate(page_ids):
+            for j, metric_name in enumerate(metric_names):
+                values, covariate = self.get_metric_arrays(page_id, metric_name, use_cuped)
+                if len(values) < MIN_SAMPLES:
+                    print(f"Not enough data to run {metric_name} experiments for page {page_id}")
+                    continue
+                if np.ptp(values) == 0:
+                    print(f"Constant {metric_name} for page {page_id}, skipping experiments")
+                    continue
+                tasks.append({
+                    'page_id': page_id,
+                    'metric_name': metric_name,
+                    'lifts': list(lifts),
+                    'methods': list(methods),
+                    'use_cuped': use_cuped,
+                    'n_resamples': n_resamples,
+                    'values': values,
+                    'covariate': covariate,
+                    'seed': seeds[i * len(metric_names) + j],
+                })
+
+        if not tasks:
+            return []
+
+        # 2. Run experiments across the worker pool (no bigger than the task list)
+        workers = min(self.max_workers or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            page_results = [analyze_page_experiments(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                page_results = list(executor.map(analyze_page_experiments, tasks))
+        results = [r for page in page_results for r in page]
+
+        # 3. Multiple testing correction across pages
+        # Tests that could not produce a p-value stay out of the family
+        families: Dict[tuple, List[dict]] = {}
+        for r in results:
+            if np.isfinite(r['p_value']):
+                families.setdefault((r['metric_name'], r['lift'], r['method']), []).append(r)
+            else:
+                r['p_value'] = None
+                r['p_value_adjusted'] = None
+                r['conclusion'] = "Inconclusive"
+
+        for family in families.values():
+            reject, p_adjusted, _, _ = multipletests([r['p_value'] for r in family], alpha=alpha, method=correction)
+            for r, rej, p_adj in zip(family, reject, p_adjusted):
+                r['p_value_adjusted'] = float(p_adj)
+                r['conclusion'] = "Significant" if rej else "Not Significant"
+
+        # 4. Record Results
+        for r in results:
+            suffix = "_cuped" if r['use_cuped'] else ""
+            self.session.add(ExperimentResult(
+                run_id=str(uuid.uuid4()),
+                page_id=r['page_id'],
+                metric_name=f"{r['metric_name']}_historical_lift_{r['lift']}_{r['method']}{suffix}",
+                method=r['method'],
+                effect_size=r['effect_size'],
+                p_value=r['p_value'],
+                p_value_adjusted=r['p_value_adjusted'],
+                confidence_interval_lower=r['ci_low'],
+                confidence_interval_upper=r['ci_high'],
+                conclusion=r['conclusion'],
+                power_analysis=None
+            ))
+        self.session.commit()
+
+        return results
+
 def run_experiments():
     print("Starting Experiment Simulation...")
     session = next(get_db())
     try:
         pages = session.query(Page).all()
         engine = ExperimentEngine(session)
-        
-        for page in pages:
-            print(f"Simulating experiment for {page.page_title}...")
-            # Simulate a 10% improvement in growth rate
-            engine.simulate_experiment(page.page_id, lift=0.10)
+
+        # Simulate a 10% improvement in growth rate on historical data,
+        # bootstrapped + permutation tested, with BH correction across pages
+        results = engine.run_experiments_batch([page.page_id for page in pages], lifts=(0.10,))
+        titles = {page.page_id: page.page_title for page in pages}
+        for r in results:
+            if r['p_value'] is None:
+                print(f"  {titles[r['page_id']]} [{r['method']}]: {r['conclusion']}")
+                continue
+            print(f"  {titles[r['page_id']]} [{r['method']}]: {r['conclusion']} "
+                  f"(p={r['p_value']:.4f}, p_adj={r['p_value_adjusted']:.4f}, effect={r['effect_size']:.4f})")
     except Exception as e:
         print(f"Experimentation failed: {e}")
         session.rollback()
@@ -1,13 +1,16 @@
+import numpy as np
 import pandas as pd
+from typing import Optional
 from sqlalchemy.orm import Session
 from statsmodels.tsa.seasonal import seasonal_decompose
 from src.warehouse.db import get_db
 from src.warehouse.models import Page, PageView, PageMetric
+from src.pipelines.gap_filling import prepare_page_series, DEFAULT_FILL_METHOD
 
 def calculate_rolling_metrics(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate rolling averages and growth rates.
-    Expected DF: index=Date, columns=['views']
+    Expected DF: index=Date (continuous daily calendar), columns=['views']
     """
     df = df.sort_index()
     
@@ -16,8 +19,10 @@ def calculate_rolling_metrics(df: pd.DataFrame) -> pd.DataFrame:
     df['rolling_30d'] = df['views'].rolling(window=30, min_periods=1).mean()
     
     # Growth rates
-    df['growth_daily'] = df['views'].pct_change(1)
-    df['growth_weekly'] = df['views'].pct_change(7)
+    # No padding across gaps, and zero views must not produce infinite growth
+    df['growth_daily'] = df['views'].pct_change(1, fill_method=None)
+    df['growth_weekly'] = df['views'].pct_change(7, fill_method=None)
+    df[['growth_daily', 'growth_weekly']] = df[['growth_daily', 'growth_weekly']].replace([np.inf, -np.inf], np.nan)
     
     df = df.fillna(0)
     return df
@@ -25,23 +30,34 @@ def calculate_rolling_metrics(df: pd.DataFrame) -> pd.DataFrame:
 def calculate_stl_residual(df: pd.DataFrame) -> pd.Series:
     """
     Perform STL decomposition and return residuals.
+    Decomposes the span between the first and last observed day; days
+    outside it get a residual of 0.
     """
+    residuals = pd.Series(0.0, index=df.index)
+    valid = df['views'].dropna()
+    if valid.empty:
+        return residuals
+    # Interior gaps are interpolated only as decomposition input
+    views = df['views'].loc[valid.index[0]:valid.index[-1]].interpolate(method='linear')
+
     # Need at least 2 cycles (e.g., 14 days for weekly seasonality)
-    if len(df) < 14:
-        return pd.Series(0, index=df.index)
+    if len(views) < 14:
+        return residuals
         
     try:
         # Decompose assuming weekly seasonality (period=7)
         # Using additive model
-        result = seasonal_decompose(df['views'], model='additive', period=7)
-        return result.resid.fillna(0)
+        result = seasonal_decompose(views, model='additive', period=7)
+        residuals.loc[result.resid.index] = result.resid.fillna(0)
+        return residuals
     except Exception as e:
         print(f"STL Decomposition failed: {e}")
         return pd.Series(0, index=df.index)
 
-def process_features_for_page(session: Session, page_id: int):
+def process_features_for_page(session: Session, page_id: int, fill_method: Optional[str] = DEFAULT_FILL_METHOD):
     """
     Load data, compute features, and save to fact_metrics.
+    Gaps are filled with `fill_method` (see data_quality.DEFAULT_FILL_METHOD).
     """
     # Load raw views
     query = session.query(PageView).filter_by(page_id=page_id).order_by(PageView.date)
@@ -50,14 +66,17 @@ def process_features_for_page(session: Session, page_id: int):
     if df.empty:
         return
 
-    df['date'] = pd.to_datetime(df['date'])
-    df.set_index('date', inplace=True)
+    # Dedupe, reindex to a continuous calendar and fill gaps
+    df = prepare_page_series(df, fill_method)
     
     # Compute Features
     df_metrics = calculate_rolling_metrics(df)
     residuals = calculate_stl_residual(df)
     df_metrics['stl_residual'] = residuals
     
+    # Days still missing after gap filling (leading/trailing) get no metrics
+    df_metrics = df_metrics[df['views'].notna()]
+    
     # Save to fact_metrics
     # We want to perform upsert. 
     # For simplicity, we can delete existing metrics for this page and re-insert 
@@ -88,14 +107,14 @@ def process_features_for_page(session: Session, page_id: int):
     
     session.commit()
 
-def run_feature_engineering():
+def run_feature_engineering(fill_method: Optional[str] = DEFAULT_FILL_METHOD):
     print("Starting Feature Engineering...")
     session = next(get_db())
     try:
         pages = session.query(Page).all()
         for page in pages:
             print(f"Processing features for {page.page_title}...")
-            process_features_for_page(session, page.page_id)
+            process_features_for_page(session, page.page_id, fill_method)
     except Exception as e:
         print(f"Feature Engineering failed: {e}")
         session.rollback()
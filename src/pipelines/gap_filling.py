@@ -0,0 +1,92 @@
+import datetime
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# Pure pandas helpers shared by data_quality and feature_engineering.
+# Keep ingestion/DB imports out of this module.
+
+# How gaps are filled when the series is prepared for feature engineering.
+# 'interpolate' (linear, interior gaps only), 'ffill', or None to leave gaps empty.
+# Feature engineering applies this method and the quality report counts filled days with it.
+DEFAULT_FILL_METHOD = 'interpolate'
+
+
+def build_calendar(df: pd.DataFrame, start_date: Optional[datetime.date] = None,
+                   end_date: Optional[datetime.date] = None) -> pd.DataFrame:
+    """
+    Build a continuous daily calendar for every page at once.
+    Each page spans its own first..last date, extended to start_date/end_date if given.
+    Expected DF: columns=['page_id', 'date']
+    """
+    bounds = df.groupby('page_id')['date'].agg(['min', 'max'])
+    if start_date is not None:
+        bounds['min'] = bounds['min'].clip(upper=pd.Timestamp(start_date))
+    if end_date is not None:
+        bounds['max'] = bounds['max'].clip(lower=pd.Timestamp(end_date))
+
+    lengths = ((bounds['max'] - bounds['min']).dt.days + 1).clip(lower=0).to_numpy()
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dates = np.repeat(bounds['min'].to_numpy(), lengths) + offsets.astype('timedelta64[D]')
+
+    return pd.DataFrame({
+        'page_id': np.repeat(bounds.index.to_numpy(), lengths),
+        'date': dates,
+    })
+
+
+def reindex_to_calendar(df: pd.DataFrame, start_date: Optional[datetime.date] = None,
+                        end_date: Optional[datetime.date] = None):
+    """
+    Drop duplicate rows and reindex every page to a continuous daily calendar.
+
+    Expected DF: columns=['id', 'page_id', 'date', 'views'] (raw fact_pageviews rows)
+    Returns:
+        calendar: one row per page per calendar day with 'views' (NaN when missing)
+                  and flags 'is_missing', 'is_non_positive'
+        duplicates: raw rows that repeat an earlier (page_id, date)
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values(['page_id', 'date', 'id'])
+
+    # Duplicates: keep the first ingested row for each page/date
+    dup_mask = df.duplicated(['page_id', 'date'], keep='first')
+    duplicates = df[dup_mask]
+    deduped = df[~dup_mask]
+
+    calendar = build_calendar(deduped, start_date, end_date)
+    calendar = calendar.merge(deduped[['page_id', 'date', 'views']], on=['page_id', 'date'], how='left')
+    calendar['is_missing'] = calendar['views'].isna()
+    calendar['is_non_positive'] = calendar['views'] <= 0
+
+    return calendar, duplicates
+
+
+def fill_gaps(calendar: pd.DataFrame, method: Optional[str] = DEFAULT_FILL_METHOD) -> pd.Series:
+    """
+    Fill missing and non-positive views within each page.
+    Only interior gaps are interpolated; leading/trailing gaps stay NaN.
+    """
+    views = calendar['views'].where(~calendar['is_missing'] & ~calendar['is_non_positive'])
+    if method is None:
+        return views
+
+    grouped = views.groupby(calendar['page_id'])
+    if method == 'interpolate':
+        return grouped.transform(lambda s: s.interpolate(method='linear', limit_area='inside'))
+    if method == 'ffill':
+        return grouped.ffill()
+    raise ValueError(f"Unknown fill method '{method}'")
+
+
+def prepare_page_series(df: pd.DataFrame, fill_method: Optional[str] = DEFAULT_FILL_METHOD) -> pd.DataFrame:
+    """
+    Clean a single page's raw views before feature engineering: drop duplicates,
+    reindex to a continuous calendar and fill gaps.
+    Expected DF: columns=['id', 'page_id', 'date', 'views']
+    Returns: index=Date, columns=['views'] (NaN on unfilled gaps)
+    """
+    calendar, _ = reindex_to_calendar(df)
+    calendar['views'] = fill_gaps(calendar, fill_method)
+    return calendar.set_index('date')[['views']]
@@ -48,13 +48,29 @@ def generate_markdown_report_content(session: Session) -> str:
 
     # 4. Experiment Results
     md += "\n## 3. Latest Experiment Simulations\n"
-    experiments = session.query(ExperimentResult).order_by(ExperimentResult.experiment_date.desc()).limit(5).all()
+    # Synthetic runs have no page, so outer join
+    experiments = session.query(ExperimentResult, Page.page_title).outerjoin(
+        Page, Page.page_id == ExperimentResult.page_id
+    ).order_by(
+        ExperimentResult.experiment_date.desc(),
+        Page.page_title,
+        ExperimentResult.metric_name,
+        ExperimentResult.run_id
+    ).limit(5).all()
     
     if not experiments:
         md += "No experiments run yet.\n"
     else:
-        for exp in experiments:
-            md += f"- **{exp.metric_name}**: {exp.conclusion} (Effect Size: {exp.effect_size:.2f}, p={exp.p_value:.4f})\n"
+        for exp, title in experiments:
+            label = f"{title} / {exp.metric_name}" if title else exp.metric_name
+            # Conclusions of corrected runs come from the adjusted p-value
+            if exp.p_value_adjusted is not None:
+                p_text = f"adjusted p={exp.p_value_adjusted:.4f}"
+            elif exp.p_value is not None:
+                p_text = f"p={exp.p_value:.4f}"
+            else:
+                p_text = "p=-"
+            md += f"- **{label}**: {exp.conclusion} (Effect Size: {exp.effect_size:.2f}, {p_text})\n"
             
     return md
 
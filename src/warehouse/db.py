@@ -1,6 +1,6 @@
 import os
 import time
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
 from src.warehouse.models import Base
@@ -18,11 +18,38 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Columns added to tables that already existed in earlier releases.
+# create_all never alters an existing table, so migrate_db adds whatever is missing.
+ADDED_COLUMNS = {
+    'fact_experiments': {
+        'page_id': 'INTEGER REFERENCES dim_pages(page_id)',
+        'method': 'VARCHAR',
+        'p_value_adjusted': 'FLOAT',
+    },
+    'fact_data_quality': {
+        'refetched_ranges': 'VARCHAR',
+    },
+}
+
+def migrate_db(bind=engine):
+    """Add columns from ADDED_COLUMNS that are missing from existing tables."""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    print(f"Adding column {table}.{name}")
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
 def init_db(retries=5, delay=2):
     """Initialize database tables, waiting for DB to be ready."""
     for i in range(retries):
         try:
             Base.metadata.create_all(bind=engine)
+            migrate_db(engine)
             print("Database tables created successfully.")
             return
         except OperationalError as e:
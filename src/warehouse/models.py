@@ -47,10 +47,31 @@ class ExperimentResult(Base):
     
     run_id = Column(String, primary_key=True) # UUID or generated ID
     experiment_date = Column(Date, server_default=func.current_date())
+    page_id = Column(Integer, ForeignKey('dim_pages.page_id'), nullable=True) # Null for synthetic runs
     metric_name = Column(String, nullable=False)
+    method = Column(String, nullable=True) # t_test, bootstrap, permutation
     effect_size = Column(Float)
     p_value = Column(Float)
+    p_value_adjusted = Column(Float, nullable=True) # Multiple-testing corrected
     confidence_interval_lower = Column(Float)
     confidence_interval_upper = Column(Float)
     conclusion = Column(String)
     power_analysis = Column(Float, nullable=True)
+
+class DataQualityReport(Base):
+    __tablename__ = 'fact_data_quality'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_date = Column(Date, server_default=func.current_date())
+    page_id = Column(Integer, ForeignKey('dim_pages.page_id'), nullable=False)
+    start_date = Column(Date)
+    end_date = Column(Date)
+    expected_days = Column(Integer) # Days in the continuous calendar
+    observed_days = Column(Integer)
+    missing_days = Column(Integer)
+    duplicate_rows = Column(Integer)
+    non_positive_days = Column(Integer) # Zero/negative view counts
+    outlier_days = Column(Integer)
+    filled_days = Column(Integer)
+    missing_ranges = Column(String, nullable=True) # e.g. "2024-01-03..2024-01-05;2024-02-10..2024-02-10"
+    refetched_ranges = Column(String, nullable=True) # Ranges re-requested this run, same format
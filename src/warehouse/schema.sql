@@ -30,11 +30,39 @@ CREATE TABLE IF NOT EXISTS fact_metrics (
 CREATE TABLE IF NOT EXISTS fact_experiments (
     run_id VARCHAR PRIMARY KEY,
     experiment_date DATE DEFAULT CURRENT_DATE,
+    page_id INTEGER REFERENCES dim_pages(page_id),
     metric_name VARCHAR NOT NULL,
+    method VARCHAR,
     effect_size FLOAT,
     p_value FLOAT,
+    p_value_adjusted FLOAT,
     confidence_interval_lower FLOAT,
     confidence_interval_upper FLOAT,
     conclusion VARCHAR,
     power_analysis FLOAT
 );
+
+-- Columns added after fact_experiments was first released (applied by init_db on existing databases)
+ALTER TABLE fact_experiments ADD COLUMN IF NOT EXISTS page_id INTEGER REFERENCES dim_pages(page_id);
+ALTER TABLE fact_experiments ADD COLUMN IF NOT EXISTS method VARCHAR;
+ALTER TABLE fact_experiments ADD COLUMN IF NOT EXISTS p_value_adjusted FLOAT;
+
+CREATE TABLE IF NOT EXISTS fact_data_quality (
+    id SERIAL PRIMARY KEY,
+    run_date DATE DEFAULT CURRENT_DATE,
+    page_id INTEGER NOT NULL REFERENCES dim_pages(page_id),
+    start_date DATE,
+    end_date DATE,
+    expected_days INTEGER,
+    observed_days INTEGER,
+    missing_days INTEGER,
+    duplicate_rows INTEGER,
+    non_positive_days INTEGER,
+    outlier_days INTEGER,
+    filled_days INTEGER,
+    missing_ranges VARCHAR,
+    refetched_ranges VARCHAR
+);
+
+-- Columns added after fact_data_quality was first released
+ALTER TABLE fact_data_quality ADD COLUMN IF NOT EXISTS refetched_ranges VARCHAR;
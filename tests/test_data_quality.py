@@ -0,0 +1,151 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.warehouse.models import Base, Page, PageView, DataQualityReport
+from src.pipelines.data_quality import build_quality_report, find_missing_ranges, run_data_quality, run_quality_checks
+from src.pipelines.gap_filling import fill_gaps, prepare_page_series
+from src.pipelines.feature_engineering import calculate_rolling_metrics, calculate_stl_residual
+
+def make_views(page_id, start, views, skip=()):
+    dates = [start + datetime.timedelta(days=i) for i in range(len(views))]
+    rows = [(page_id, d, v) for i, (d, v) in enumerate(zip(dates, views)) if i not in skip]
+    return pd.DataFrame(rows, columns=['page_id', 'date', 'views'])
+
+@pytest.fixture
+def raw():
+    start = datetime.date(2024, 1, 1)
+    page_1 = make_views(1, start, [100, 110, 120, 130, 140, 150, 160, 170], skip=(2, 3))
+    page_2 = make_views(2, start, [50, 0, 55, 5000, 52, 53, 54, 56, 57, 58, 51])
+    dup = page_2.iloc[[4]]
+    df = pd.concat([page_1, page_2, dup], ignore_index=True)
+    df['id'] = np.arange(len(df))
+    return df
+
+def test_quality_checks_flag_all_pages(raw):
+    calendar, duplicates = run_quality_checks(raw)
+
+    page_1 = calendar[calendar['page_id'] == 1]
+    assert len(page_1) == 8
+    assert page_1['is_missing'].sum() == 2
+
+    page_2 = calendar[calendar['page_id'] == 2]
+    assert page_2['is_non_positive'].sum() == 1
+    assert page_2['is_outlier'].sum() == 1
+    assert len(duplicates) == 1 and duplicates['page_id'].iloc[0] == 2
+
+def test_calendar_extends_to_end_date(raw):
+    calendar, _ = run_quality_checks(raw, end_date=datetime.date(2024, 1, 12))
+    ranges = find_missing_ranges(calendar)
+    assert ranges.to_dict('records') == [
+        {'page_id': 1, 'start_date': pd.Timestamp('2024-01-03'), 'end_date': pd.Timestamp('2024-01-04'), 'days': 2},
+        {'page_id': 1, 'start_date': pd.Timestamp('2024-01-09'), 'end_date': pd.Timestamp('2024-01-12'), 'days': 4},
+        {'page_id': 2, 'start_date': pd.Timestamp('2024-01-12'), 'end_date': pd.Timestamp('2024-01-12'), 'days': 1},
+    ]
+
+def test_fill_gaps_interior_only(raw):
+    calendar, _ = run_quality_checks(raw, end_date=datetime.date(2024, 1, 10))
+    filled = fill_gaps(calendar)
+    page_1 = filled[calendar['page_id'] == 1].to_numpy()
+    np.testing.assert_allclose(page_1[:8], [100, 110, 120, 130, 140, 150, 160, 170])
+    assert np.isnan(page_1[8:]).all()
+    # Zero views are treated as a gap
+    assert filled[calendar['page_id'] == 2].iloc[1] == pytest.approx(52.5)
+
+def test_quality_report(raw):
+    calendar, duplicates = run_quality_checks(raw)
+    report = build_quality_report(calendar, duplicates).set_index('page_id')
+    assert report.loc[1, 'missing_days'] == 2
+    assert report.loc[1, 'filled_days'] == 2
+    assert report.loc[1, 'missing_ranges'] == '2024-01-03..2024-01-04'
+    assert report.loc[2, 'duplicate_rows'] == 1
+    assert report.loc[2, 'observed_days'] == 11
+
+def test_growth_uses_adjacent_days_and_stays_finite(raw):
+    series = prepare_page_series(raw[raw['page_id'] == 1], fill_method=None)
+    metrics = calculate_rolling_metrics(series)
+    # 2024-01-05 follows a gap, so there is no previous day to compare against
+    assert metrics.loc['2024-01-05', 'growth_daily'] == 0
+    assert metrics.loc['2024-01-06', 'growth_daily'] == pytest.approx(150 / 140 - 1)
+
+    zeros = pd.DataFrame({'views': [0, 10, 20]}, index=pd.date_range('2024-01-01', periods=3))
+    assert np.isfinite(calculate_rolling_metrics(zeros)['growth_daily']).all()
+
+def test_quality_report_gap_free_page():
+    df = make_views(1, datetime.date(2024, 1, 1), list(range(100, 120)))
+    df['id'] = np.arange(len(df))
+    calendar, duplicates = run_quality_checks(df)
+    assert find_missing_ranges(calendar).empty
+    report = build_quality_report(calendar, duplicates)
+    assert len(report) == 1
+    assert report.loc[0, 'missing_days'] == 0
+    assert report.loc[0, 'missing_ranges'] is None
+
+def test_stl_residual_ignores_leading_and_trailing_gaps():
+    views = 100 + 10 * np.sin(np.arange(30) * 2 * np.pi / 7) + np.random.default_rng(5).normal(0, 1, 30)
+    views[0] = np.nan
+    views[-2:] = np.nan
+    series = pd.DataFrame({'views': views}, index=pd.date_range('2024-01-01', periods=30))
+    residuals = calculate_stl_residual(series)
+    assert (residuals.iloc[[0, -2, -1]] == 0).all()
+    assert (residuals.iloc[5:20] != 0).all()
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+def test_run_data_quality_db_side_effects(db):
+    today = datetime.date.today()
+    session = db()
+    session.add_all([Page(page_title="Old_Page"), Page(page_title="New_Page")])
+    session.flush()
+
+    # Old_Page: 400 days of history with one gap before the ETL window, one inside it
+    old_gap = {today - datetime.timedelta(days=d) for d in (390, 389, 388)}
+    etl_gap = {today - datetime.timedelta(days=d) for d in (10, 9)}
+    for d in range(400, 0, -1):
+        date = today - datetime.timedelta(days=d)
+        if date not in old_gap | etl_gap:
+            session.add(PageView(page_id=1, date=date, views=100 + d))
+    for d in range(30, 0, -1):
+        session.add(PageView(page_id=2, date=today - datetime.timedelta(days=d), views=50))
+    session.commit()
+    dup_date = today - datetime.timedelta(days=5)
+    first_id = session.query(PageView.id).filter_by(page_id=1, date=dup_date).scalar()
+    session.add(PageView(page_id=1, date=dup_date, views=999))
+    session.commit()
+    session.close()
+
+    def get_test_db():
+        yield db()
+
+    with patch('src.pipelines.data_quality.get_db', get_test_db), \
+         patch('src.pipelines.data_quality.ingest_data_for_topic') as ingest:
+        run_data_quality()
+        # Only the range before the ETL window is re-fetched
+        assert ingest.call_count == 1
+        _, title, start, end = ingest.call_args.args
+        assert title == "Old_Page"
+        assert start == min(old_gap).strftime("%Y%m%d") and end == max(old_gap).strftime("%Y%m%d")
+
+        # The failed range is recorded and not re-requested on the next run
+        run_data_quality()
+        assert ingest.call_count == 1
+
+    session = db()
+    remaining = session.query(PageView).filter_by(page_id=1, date=dup_date).all()
+    assert [(r.id, r.views) for r in remaining] == [(first_id, 105)]
+
+    reports = session.query(DataQualityReport).order_by(DataQualityReport.id).all()
+    assert [r.page_id for r in reports] == [1, 2, 1, 2]
+    assert reports[0].duplicate_rows == 1 and reports[2].duplicate_rows == 0
+    assert reports[0].missing_days == 5
+    assert reports[0].refetched_ranges == f"{min(old_gap)}..{max(old_gap)}"
+    assert reports[2].refetched_ranges is None
+    session.close()
@@ -0,0 +1,153 @@
+import datetime
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from src.warehouse.db import migrate_db
+from src.warehouse.models import Base, Page, PageMetric, ExperimentResult
+from src.pipelines.experiment_engine import (
+    ExperimentEngine,
+    bootstrap_test,
+    cuped_adjust,
+    permutation_test,
+    welch_interval,
+)
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    rng = np.random.default_rng(0)
+    start = datetime.date(2023, 1, 1)
+    for title in ["Page_A", "Page_B"]:
+        page = Page(page_title=title)
+        session.add(page)
+        session.flush()
+        level = rng.normal(1000, 100, 120).cumsum() / np.arange(1, 121)
+        for i in range(120):
+            session.add(PageMetric(
+                page_id=page.page_id,
+                date=start + datetime.timedelta(days=i),
+                rolling_30d_avg=float(level[i]),
+                growth_rate_daily=float(rng.normal(0.01, 0.05)),
+            ))
+    session.commit()
+    yield session
+    session.close()
+
+def test_welch_interval_independent_samples():
+    rng = np.random.default_rng(1)
+    treatment = rng.normal(1.0, 1.0, 500)
+    control = rng.normal(0.0, 1.0, 400)
+    ci_low, ci_high = welch_interval(treatment, control)
+    assert ci_low < 1.0 < ci_high
+    # Width should match sqrt(var_t/n_t + var_c/n_c), not the paired difference
+    se = np.sqrt(np.var(treatment, ddof=1) / 500 + np.var(control, ddof=1) / 400)
+    assert ci_high - ci_low == pytest.approx(2 * 1.96 * se, rel=0.01)
+
+def test_bootstrap_and_permutation_detect_shift():
+    rng = np.random.default_rng(2)
+    treatment = rng.normal(0.5, 1.0, 200)
+    control = rng.normal(0.0, 1.0, 200)
+    p_boot, ci_low, ci_high = bootstrap_test(treatment, control, rng, n_resamples=1000)
+    p_perm = permutation_test(treatment, control, rng, n_resamples=1000)
+    assert p_boot < 0.05 and p_perm < 0.05
+    assert 0 < ci_low < ci_high
+
+def test_permutation_null_not_significant():
+    rng = np.random.default_rng(3)
+    values = rng.normal(0.0, 1.0, 400)
+    assert permutation_test(values[:200], values[200:], rng, n_resamples=1000) > 0.05
+
+def test_cuped_reduces_variance():
+    rng = np.random.default_rng(4)
+    covariate = rng.normal(10, 2, 1000)
+    values = 3 * covariate + rng.normal(0, 1, 1000)
+    adjusted = cuped_adjust(values, covariate)
+    assert np.var(adjusted) < 0.1 * np.var(values)
+    assert np.mean(adjusted) == pytest.approx(np.mean(values))
+
+def test_run_experiments_batch_loads_once_and_corrects(session):
+    engine = ExperimentEngine(session, max_workers=1)
+    page_ids = [p.page_id for p in session.query(Page).all()]
+
+    statements = []
+    event.listen(session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    results = engine.run_experiments_batch(page_ids, methods=('t_test', 'bootstrap', 'permutation'), n_resamples=200, seed=7)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1
+
+    assert len(results) == 6
+    for r in results:
+        assert r['p_value_adjusted'] >= r['p_value']
+        assert r['ci_low'] <= r['ci_high']
+    assert session.query(ExperimentResult).count() == 6
+
+def test_run_experiments_batch_rejects_unknown_method(session):
+    engine = ExperimentEngine(session, max_workers=1)
+    with pytest.raises(ValueError):
+        engine.run_experiments_batch([1], methods=('anova',))
+
+def test_get_metric_arrays_keeps_covariate_gaps_without_cuped(session):
+    engine = ExperimentEngine(session, max_workers=1)
+    values, covariate = engine.get_metric_arrays(1, 'growth_rate_daily', use_cuped=False)
+    assert len(values) == 120 and covariate is None
+
+    values, covariate = engine.get_metric_arrays(1, 'growth_rate_daily', use_cuped=True)
+    # First day has no lagged covariate
+    assert len(values) == len(covariate) == 119
+
+def test_welch_interval_constant_groups():
+    assert welch_interval(np.full(10, 2.0), np.full(10, 1.0)) == (1.0, 1.0)
+
+def test_covariate_lag_uses_calendar_days(session):
+    # Drop 2023-01-10 so the row before 2023-01-11 is two days earlier
+    session.query(PageMetric).filter_by(page_id=1, date=datetime.date(2023, 1, 10)).delete()
+    session.commit()
+    engine = ExperimentEngine(session, max_workers=1)
+    values, covariate = engine.get_metric_arrays(1, 'growth_rate_daily', use_cuped=True)
+    # Day 1 and the day after the missing date have no previous-day covariate
+    assert len(values) == len(covariate) == 117
+
+    expected = session.query(PageMetric.rolling_30d_avg).filter_by(page_id=1, date=datetime.date(2023, 1, 11)).scalar()
+    # 2023-01-12 follows 01-02..01-09 in the arrays and is lagged by the 01-11 value
+    assert covariate[8] == pytest.approx(expected)
+
+def test_run_experiments_batch_pool_with_flat_page(session):
+    flat = Page(page_title="Flat_Page")
+    session.add(flat)
+    session.flush()
+    for i in range(60):
+        session.add(PageMetric(
+            page_id=flat.page_id,
+            date=datetime.date(2023, 1, 1) + datetime.timedelta(days=i),
+            rolling_30d_avg=100.0 + i,
+            growth_rate_daily=0.0,
+        ))
+    session.commit()
+    page_ids = [p.page_id for p in session.query(Page).order_by(Page.page_id).all()]
+
+    serial = ExperimentEngine(session, max_workers=1).run_experiments_batch(
+        page_ids, methods=('t_test', 'permutation'), n_resamples=200, seed=11)
+    pooled = ExperimentEngine(session, max_workers=2).run_experiments_batch(
+        page_ids, methods=('t_test', 'permutation'), n_resamples=200, seed=11)
+
+    # The flat page is skipped and never poisons the correction family
+    assert {r['page_id'] for r in pooled} == set(page_ids[:2])
+    for r in pooled:
+        assert np.isfinite(r['p_value_adjusted'])
+        assert np.isfinite(r['ci_low']) and np.isfinite(r['ci_high'])
+    # Same seeds give the same results whether or not the pool is used
+    assert [r['p_value'] for r in pooled] == [r['p_value'] for r in serial]
+
+def test_migrate_db_adds_experiment_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE fact_experiments (run_id VARCHAR PRIMARY KEY, metric_name VARCHAR NOT NULL, p_value FLOAT)"))
+    migrate_db(engine)
+    columns = {c['name'] for c in inspect(engine).get_columns('fact_experiments')}
+    assert {'page_id', 'method', 'p_value_adjusted'} <= columns
+    # Running it again is a no-op
+    migrate_db(engine)